@@ -0,0 +1,72 @@
+import functools
+import os
+import threading
+from collections import OrderedDict
+
+try:
+    from backend.db import get_conn, get_data_version
+except ModuleNotFoundError:
+    from db import get_conn, get_data_version
+
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "256"))
+
+_lock = threading.Lock()
+_entries = OrderedDict()
+_version = None
+
+
+def _current_version():
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            return get_data_version(cur)
+
+
+def _lookup(key, version):
+    global _version
+    with _lock:
+        if _version is None or version > _version:
+            # Another process loaded new data; everything cached is stale.
+            _entries.clear()
+            _version = version
+            return None
+        if version < _version:
+            # A slow request read the version before a newer bump; never
+            # move the cache back to older data.
+            return None
+        if key not in _entries:
+            return None
+        _entries.move_to_end(key)
+        return _entries[key]
+
+
+def _store(key, version, value):
+    with _lock:
+        if version != _version:
+            return
+        _entries[key] = value
+        _entries.move_to_end(key)
+        while len(_entries) > CACHE_MAX_ENTRIES:
+            _entries.popitem(last=False)
+
+
+def cached_aggregate(func):
+    """Cache an endpoint result per worker, keyed by its arguments.
+
+    Entries are tagged with the ``data_version`` row in Postgres, which every
+    worker reads on each request, so all workers drop their cache as soon as
+    load_xlsx.py commits new data.
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if CACHE_MAX_ENTRIES <= 0:
+            return func(*args, **kwargs)
+        key = (func.__name__, args, tuple(sorted(kwargs.items())))
+        version = _current_version()
+        value = _lookup(key, version)
+        if value is None:
+            value = func(*args, **kwargs)
+            _store(key, version, value)
+        return value
+
+    return wrapper
@@ -1,4 +1,7 @@
 import os
+import queue
+import threading
+from contextlib import contextmanager
 from pathlib import Path
 from urllib.parse import urlparse
 
@@ -7,8 +10,16 @@ from dotenv import load_dotenv
 
 load_dotenv(Path(__file__).resolve().parent / ".env")
 
+# Each process (every uvicorn worker) keeps its own bounded pool, so the total
+# number of server connections is roughly workers * PG_POOL_SIZE.
+POOL_SIZE = max(1, int(os.getenv("PG_POOL_SIZE", "5")))
+POOL_TIMEOUT = float(os.getenv("PG_POOL_TIMEOUT", "30"))
 
-def get_conn():
+_pool_slots = threading.BoundedSemaphore(POOL_SIZE)
+_idle_conns = queue.LifoQueue(maxsize=POOL_SIZE)
+
+
+def connect():
     database_url = os.getenv("DATABASE_URL")
     if database_url:
         parsed = urlparse(database_url)
@@ -39,6 +50,68 @@ def get_conn():
     return conn
 
 
+def _close_quietly(conn):
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+
+def _checkout():
+    try:
+        conn = _idle_conns.get_nowait()
+    except queue.Empty:
+        return connect()
+    # Idle connections may have been dropped by a Postgres restart or an
+    # idle timeout; replace them here instead of failing the request.
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1")
+    except Exception:
+        _close_quietly(conn)
+        return connect()
+    return conn
+
+
+@contextmanager
+def get_conn():
+    if not _pool_slots.acquire(timeout=POOL_TIMEOUT):
+        raise RuntimeError("Pool koneksi database penuh")
+    try:
+        conn = _checkout()
+        try:
+            yield conn
+        except Exception:
+            # The connection may be mid-transaction or broken; do not reuse it.
+            _close_quietly(conn)
+            raise
+        _idle_conns.put_nowait(conn)
+    finally:
+        _pool_slots.release()
+
+
+@contextmanager
+def dedicated_conn():
+    """Unpooled connection for long-running work such as background imports."""
+    conn = connect()
+    try:
+        yield conn
+    finally:
+        _close_quietly(conn)
+
+
+def get_data_version(cursor):
+    cursor.execute("SELECT version FROM data_version WHERE id = 1")
+    return fetchone_value(cursor) or 0
+
+
+def bump_data_version(cursor):
+    cursor.execute(
+        "UPDATE data_version SET version = version + 1, updated_at = NOW() "
+        "WHERE id = 1"
+    )
+
+
 def fetchall_dict(cursor):
     columns = [col[0] for col in cursor.description]
     return [dict(zip(columns, row)) for row in cursor.fetchall()]
@@ -0,0 +1,265 @@
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+try:
+    from backend.db import connect, dedicated_conn, fetchall_dict, get_conn
+    from backend.load_xlsx import get_data_dir, load_file, parse_periode
+except ModuleNotFoundError:
+    from db import connect, dedicated_conn, fetchall_dict, get_conn
+    from load_xlsx import get_data_dir, load_file, parse_periode
+
+IMPORT_WORKERS = max(1, int(os.getenv("IMPORT_WORKERS", "2")))
+MAX_UPLOAD_BYTES = int(float(os.getenv("MAX_UPLOAD_MB", "50")) * 1024 * 1024)
+HEARTBEAT_INTERVAL = float(os.getenv("IMPORT_HEARTBEAT_SECONDS", "10"))
+JOB_TIMEOUT = float(os.getenv("IMPORT_JOB_TIMEOUT_SECONDS", "60"))
+
+# Identifies this API worker process in import_jobs.owner. It does not depend
+# on the hostname or pid, both of which change or repeat across container
+# restarts.
+OWNER = uuid.uuid4().hex
+
+JOB_SELECT = (
+    "SELECT id, filename, periode, status, rows_parsed, rows_written, error, "
+    "created_at, started_at, finished_at, "
+    "EXTRACT(EPOCH FROM (COALESCE(finished_at, NOW()) - started_at)) "
+    "AS elapsed_seconds "
+    "FROM import_jobs"
+)
+
+# Imports run in separate processes so parsing a workbook never holds the GIL
+# of the API worker that received the upload. Each running import holds two
+# connections of its own (load transaction and status updates), outside the
+# request pool in db.py. Job state lives in Postgres, so any API worker can
+# answer status requests.
+_executor = None
+_executor_lock = threading.Lock()
+_heartbeat_thread = None
+
+
+class UploadTooLarge(ValueError):
+    pass
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=IMPORT_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _executor
+
+
+def get_staging_dir() -> str:
+    # Not matched by load_xlsx.py's *.xlsx glob, which is not recursive.
+    return os.path.join(get_data_dir(), ".staging")
+
+
+def new_job_id() -> str:
+    return uuid.uuid4().hex
+
+
+def save_upload(fileobj, job_id: str) -> str:
+    """Copy an upload to a per-job staging file and return its path."""
+    staging_dir = get_staging_dir()
+    os.makedirs(staging_dir, exist_ok=True)
+    path = os.path.join(staging_dir, f"{job_id}.xlsx")
+    try:
+        written = 0
+        with open(path, "wb") as out:
+            while True:
+                chunk = fileobj.read(1024 * 1024)
+                if not chunk:
+                    break
+                written += len(chunk)
+                if written > MAX_UPLOAD_BYTES:
+                    raise UploadTooLarge("ukuran file melebihi batas")
+                out.write(chunk)
+    except Exception:
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+    return path
+
+
+class _JobStatus:
+    """Writes a job's status over its own connection, reconnecting once."""
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.conn = None
+
+    def update(self, assignments: str, params=None):
+        for attempt in range(2):
+            try:
+                if self.conn is None:
+                    self.conn = connect()
+                with self.conn.cursor() as cur:
+                    cur.execute(
+                        f"UPDATE import_jobs SET {assignments}, "
+                        "heartbeat_at = NOW() WHERE id = %s",
+                        list(params or []) + [self.job_id],
+                    )
+                return
+            except Exception:
+                self.close()
+                if attempt:
+                    raise
+
+    def try_update(self, assignments: str, params=None):
+        try:
+            self.update(assignments, params)
+        except Exception as exc:
+            print(f"Gagal memperbarui status job {self.job_id}: {exc}")
+
+    def close(self):
+        if self.conn is not None:
+            try:
+                self.conn.close()
+            except Exception:
+                pass
+            self.conn = None
+
+
+@contextmanager
+def _publishing_conn(periode: int, staged_path: str, filename: str):
+    with dedicated_conn() as conn:
+        with conn.cursor() as cur:
+            # Session-level lock on the key load_file locks per transaction
+            # (a session may re-take its own advisory lock). It keeps the
+            # file move below in commit order for imports of the same period.
+            cur.execute("SELECT pg_advisory_lock(%s)", [periode])
+        yield conn
+        # Only reached after load_file committed.
+        try:
+            os.replace(staged_path, os.path.join(get_data_dir(), filename))
+        except OSError as exc:
+            print(f"Gagal menyimpan {filename} ke direktori data: {exc}")
+
+
+def _run_import(job_id: str, staged_path: str, filename: str, periode: int):
+    status = _JobStatus(job_id)
+    try:
+        status.update("status = 'running', started_at = NOW()")
+        count = load_file(
+            staged_path,
+            replace=True,
+            # Losing a progress update must not abort the import itself.
+            progress=lambda parsed, written: status.try_update(
+                "rows_parsed = %s, rows_written = %s", [parsed, written]
+            ),
+            conn_factory=lambda: _publishing_conn(
+                periode, staged_path, filename
+            ),
+            periode=periode,
+        )
+    except Exception as exc:
+        status.try_update(
+            "status = 'failed', error = %s, finished_at = NOW()", [str(exc)]
+        )
+    else:
+        status.try_update(
+            "status = 'done', rows_parsed = %s, rows_written = %s, "
+            "finished_at = NOW()",
+            [count, count],
+        )
+    finally:
+        status.close()
+        if os.path.exists(staged_path):
+            os.remove(staged_path)
+
+
+def submit_import(job_id: str, staged_path: str, filename: str) -> str:
+    periode = parse_periode(filename)
+    if periode is None:
+        raise ValueError(f"Periode tidak ditemukan dari nama file: {filename}")
+
+    try:
+        with get_conn() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "INSERT INTO import_jobs (id, filename, periode, owner) "
+                    "VALUES (%s, %s, %s, %s)",
+                    [job_id, filename, periode, OWNER],
+                )
+    except Exception:
+        os.remove(staged_path)
+        raise
+    _get_executor().submit(_run_import, job_id, staged_path, filename, periode)
+    return job_id
+
+
+def fail_orphaned_jobs():
+    """Mark queued/running jobs whose heartbeat has gone stale as failed."""
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "UPDATE import_jobs SET status = 'failed', error = %s, "
+                "finished_at = NOW() "
+                "WHERE status IN ('queued', 'running') "
+                "AND heartbeat_at < NOW() - %s * INTERVAL '1 second' "
+                "RETURNING id",
+                ["worker berhenti sebelum import selesai", JOB_TIMEOUT],
+            )
+            return len(cur.fetchall())
+
+
+def _heartbeat_loop():
+    while True:
+        time.sleep(HEARTBEAT_INTERVAL)
+        try:
+            with get_conn() as conn:
+                with conn.cursor() as cur:
+                    cur.execute(
+                        "UPDATE import_jobs SET heartbeat_at = NOW() "
+                        "WHERE owner = %s AND status IN ('queued', 'running')",
+                        [OWNER],
+                    )
+            fail_orphaned_jobs()
+        except Exception as exc:
+            print(f"Gagal memperbarui heartbeat job import: {exc}")
+
+
+def start_heartbeat():
+    global _heartbeat_thread
+    if _heartbeat_thread is None:
+        _heartbeat_thread = threading.Thread(
+            target=_heartbeat_loop, name="import-heartbeat", daemon=True
+        )
+        _heartbeat_thread.start()
+
+
+def _with_throughput(job):
+    elapsed = job.pop("elapsed_seconds")
+    elapsed = float(elapsed) if elapsed is not None else None
+    job["elapsed_seconds"] = round(elapsed, 3) if elapsed is not None else None
+    job["rows_per_second"] = (
+        round(job["rows_written"] / elapsed, 1) if elapsed else None
+    )
+    return job
+
+
+def get_job(job_id: str):
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(f"{JOB_SELECT} WHERE id = %s", [job_id])
+            rows = fetchall_dict(cur)
+    if not rows:
+        return None
+    return _with_throughput(rows[0])
+
+
+def list_jobs(limit: int):
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                f"{JOB_SELECT} ORDER BY created_at DESC LIMIT %s", [limit]
+            )
+            rows = fetchall_dict(cur)
+    return [_with_throughput(row) for row in rows]
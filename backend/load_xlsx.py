@@ -7,9 +7,9 @@ from openpyxl import load_workbook
 from typing import Optional
 
 try:
-    from backend.db import get_conn
+    from backend.db import bump_data_version, get_conn
 except ModuleNotFoundError:
-    from db import get_conn
+    from db import bump_data_version, get_conn
 
 
 def normalize_label(label: str) -> str:
@@ -108,6 +108,8 @@ BOOL_COLUMNS = {
     "approve_daak",
 }
 
+BATCH_SIZE = 500
+
 DATE_COLUMNS = {"tanggal_lahir", "tanggal_lulus"}
 INT_COLUMNS = {"masa_studi_bulan", "sks"}
 FLOAT_COLUMNS = {"masa_studi_tahun", "ipk"}
@@ -194,70 +196,101 @@ def parse_periode(filename: str) -> Optional[int]:
     return int(match.group(1))
 
 
-def load_file(path: str):
-    periode = parse_periode(os.path.basename(path))
+def load_file(
+    path: str,
+    replace: bool = False,
+    progress=None,
+    conn_factory=None,
+    periode: Optional[int] = None,
+):
+    """Load one workbook into both tables inside a single transaction.
+
+    With ``replace`` the period's existing rows are deleted first, so readers
+    see either the old or the new period, never a mix; a workbook without any
+    usable row is rejected instead of leaving the old period in place.
+    ``progress`` is called as ``progress(rows_parsed, rows_written)`` every
+    BATCH_SIZE rows. ``conn_factory`` defaults to the request pool.
+    ``periode`` overrides the period parsed from the file name.
+    """
+    if periode is None:
+        periode = parse_periode(os.path.basename(path))
     if periode is None:
         raise ValueError(f"Periode tidak ditemukan dari nama file: {path}")
 
-    wb = load_workbook(path, data_only=True)
+    # Read-only mode streams rows instead of building the whole sheet in memory.
+    wb = load_workbook(path, data_only=True, read_only=True)
     ws = wb.active
 
-    header_cells = list(ws[1])
-    headers = [normalize_label(str(cell.value or "")) for cell in header_cells]
-    col_map = {
-        idx: COLUMN_MAP[header]
-        for idx, header in enumerate(headers)
-        if header in COLUMN_MAP
-    }
-    unknown_headers = [
-        header_cells[idx].value
-        for idx, header in enumerate(headers)
-        if header and header not in COLUMN_MAP
-    ]
-    if unknown_headers:
-        print(f"Kolom tidak dikenal di {os.path.basename(path)}: {unknown_headers}")
-
-    if "npm" not in col_map.values():
-        raise ValueError("Kolom wajib tidak ditemukan: ['npm']")
-
-    rows_raw = []
-    rows_norm = []
-    for row in ws.iter_rows(min_row=2, values_only=True):
-        record_raw = {col: None for col in DB_COLUMNS}
-        record_norm = {col: None for col in DB_COLUMNS}
-        record_raw["periode"] = periode
-        record_norm["periode"] = periode
-
-        for idx, value in enumerate(row):
-            if idx not in col_map:
-                continue
-            col_name = col_map[idx]
-            if col_name == "npm":
-                record_raw[col_name] = (
-                    str(value).strip() if value is not None else None
-                )
-                record_norm[col_name] = record_raw[col_name]
+    try:
+        header_cells = list(ws[1])
+        headers = [normalize_label(str(cell.value or "")) for cell in header_cells]
+        col_map = {
+            idx: COLUMN_MAP[header]
+            for idx, header in enumerate(headers)
+            if header in COLUMN_MAP
+        }
+        unknown_headers = [
+            header_cells[idx].value
+            for idx, header in enumerate(headers)
+            if header and header not in COLUMN_MAP
+        ]
+        if unknown_headers:
+            print(f"Kolom tidak dikenal di {os.path.basename(path)}: {unknown_headers}")
+
+        if "npm" not in col_map.values():
+            raise ValueError("Kolom wajib tidak ditemukan: ['npm']")
+
+        rows_raw = []
+        rows_norm = []
+        for row in ws.iter_rows(min_row=2, values_only=True):
+            record_raw = {col: None for col in DB_COLUMNS}
+            record_norm = {col: None for col in DB_COLUMNS}
+            record_raw["periode"] = periode
+            record_norm["periode"] = periode
+
+            for idx, value in enumerate(row):
+                if idx not in col_map:
+                    continue
+                col_name = col_map[idx]
+                if col_name == "npm":
+                    record_raw[col_name] = (
+                        str(value).strip() if value is not None else None
+                    )
+                    record_norm[col_name] = record_raw[col_name]
+                    continue
+                record_raw[col_name] = to_text(value)
+                if col_name in BOOL_COLUMNS:
+                    record_norm[col_name] = to_bool(value)
+                elif col_name in DATE_COLUMNS:
+                    record_norm[col_name] = to_date(value)
+                elif col_name in INT_COLUMNS:
+                    number = to_number(value)
+                    record_norm[col_name] = int(number) if number is not None else None
+                elif col_name in FLOAT_COLUMNS:
+                    record_norm[col_name] = to_number(value)
+                else:
+                    record_norm[col_name] = to_text(value)
+
+            if not record_raw["npm"]:
                 continue
-            record_raw[col_name] = to_text(value)
-            if col_name in BOOL_COLUMNS:
-                record_norm[col_name] = to_bool(value)
-            elif col_name in DATE_COLUMNS:
-                record_norm[col_name] = to_date(value)
-            elif col_name in INT_COLUMNS:
-                number = to_number(value)
-                record_norm[col_name] = int(number) if number is not None else None
-            elif col_name in FLOAT_COLUMNS:
-                record_norm[col_name] = to_number(value)
-            else:
-                record_norm[col_name] = to_text(value)
-
-        if not record_raw["npm"]:
-            continue
-        rows_raw.append([record_raw[col] for col in DB_COLUMNS])
-        rows_norm.append([record_norm[col] for col in DB_COLUMNS])
+            rows_raw.append([record_raw[col] for col in DB_COLUMNS])
+            rows_norm.append([record_norm[col] for col in DB_COLUMNS])
+            if progress and len(rows_raw) % BATCH_SIZE == 0:
+                progress(len(rows_raw), 0)
+    finally:
+        wb.close()
+
     if not rows_raw:
+        if replace:
+            raise ValueError(
+                f"Tidak ada baris dengan npm di {os.path.basename(path)}"
+            )
         return 0
 
+    total = len(rows_raw)
+    if progress:
+        progress(total, 0)
+
     insert_cols = ", ".join(DB_COLUMNS)
     update_cols = [col for col in DB_COLUMNS if col not in {"npm", "periode"}]
     set_clause = ", ".join([f"{col} = EXCLUDED.{col}" for col in update_cols])
@@ -273,25 +306,44 @@ def load_file(path: str):
         f"ON CONFLICT (npm, periode) DO UPDATE SET {set_clause}"
     )
 
-    with get_conn() as conn:
+    with (conn_factory or get_conn)() as conn:
+        conn.autocommit = False
         with conn.cursor() as cur:
-            cur.executemany(query_raw, rows_raw)
-            cur.executemany(query_norm, rows_norm)
+            if replace:
+                # Serialize concurrent imports of the same period.
+                cur.execute("SELECT pg_advisory_xact_lock(%s)", [periode])
+                cur.execute(
+                    "DELETE FROM peserta_wisuda_raw WHERE periode = %s", [periode]
+                )
+                cur.execute(
+                    "DELETE FROM peserta_wisuda WHERE periode = %s", [periode]
+                )
+            for start in range(0, total, BATCH_SIZE):
+                end = min(start + BATCH_SIZE, total)
+                cur.executemany(query_raw, rows_raw[start:end])
+                cur.executemany(query_norm, rows_norm[start:end])
+                if progress:
+                    progress(total, end)
+            bump_data_version(cur)
         conn.commit()
+        conn.autocommit = True
 
-    return len(rows_raw)
+    return total
 
 
-def main():
+def get_data_dir() -> str:
     base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
     data_dir = os.path.join(base_dir, "history_peserta_wisuda")
-    
+
     # Fallback for Docker environment (where script is in /app and data is in /app/history_peserta_wisuda)
     if not os.path.exists(data_dir):
         data_dir = os.path.join(os.path.dirname(__file__), "history_peserta_wisuda")
+    return data_dir
+
 
+def main():
+    data_dir = get_data_dir()
     pattern = os.path.join(data_dir, "*.xlsx")
-    print(f"DEBUG: base_dir={base_dir}")
     print(f"DEBUG: data_dir={data_dir}")
     print(f"DEBUG: pattern={pattern}")
     files = sorted(glob.glob(pattern))
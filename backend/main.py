@@ -1,20 +1,108 @@
+import hmac
 import os
+from contextlib import asynccontextmanager
 from pathlib import Path
 
 from dotenv import load_dotenv
 
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import Depends, FastAPI, File, Header, HTTPException, Query, UploadFile
 from typing import Optional
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
 try:
+    from backend.cache import cached_aggregate
     from backend.db import fetchall_dict, fetchone_value, get_conn
+    from backend.jobs import (
+        MAX_UPLOAD_BYTES,
+        UploadTooLarge,
+        fail_orphaned_jobs,
+        get_job,
+        list_jobs,
+        new_job_id,
+        save_upload,
+        start_heartbeat,
+        submit_import,
+    )
+    from backend.load_xlsx import parse_periode
 except ModuleNotFoundError:
+    from cache import cached_aggregate
     from db import fetchall_dict, fetchone_value, get_conn
+    from jobs import (
+        MAX_UPLOAD_BYTES,
+        UploadTooLarge,
+        fail_orphaned_jobs,
+        get_job,
+        list_jobs,
+        new_job_id,
+        save_upload,
+        start_heartbeat,
+        submit_import,
+    )
+    from load_xlsx import parse_periode
 
 load_dotenv(Path(__file__).resolve().parent / ".env")
 
-app = FastAPI(title="History Peserta Wisuda API")
+# Room for the multipart boundaries and part headers around the workbook.
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    try:
+        count = fail_orphaned_jobs()
+        if count:
+            print(f"{count} job import yatim ditandai gagal")
+    except Exception as exc:
+        print(f"Gagal memeriksa job import yatim: {exc}")
+    start_heartbeat()
+    yield
+
+
+class UploadSizeLimitMiddleware:
+    """Reject oversized upload bodies before Starlette spools them to disk."""
+
+    def __init__(self, app, path: str, max_bytes: int):
+        self.app = app
+        self.path = path
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "POST"
+            or scope["path"] != self.path
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        length = headers.get(b"content-length", b"")
+        if length.isdigit() and int(length) > self.max_bytes:
+            response = JSONResponse(
+                {"detail": "ukuran file melebihi batas"}, status_code=413
+            )
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            # Covers chunked bodies and a Content-Length that understates.
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    raise HTTPException(
+                        status_code=413, detail="ukuran file melebihi batas"
+                    )
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+app = FastAPI(title="History Peserta Wisuda API", lifespan=lifespan)
 
 cors_origins = [
     origin.strip()
@@ -22,6 +110,13 @@ cors_origins = [
     if origin.strip()
 ]
 
+# Added before CORS so that 413 responses still carry CORS headers.
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    path="/api/imports",
+    max_bytes=MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES,
+)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=cors_origins,
@@ -37,6 +132,7 @@ def health_check():
 
 
 @app.get("/api/periods")
+@cached_aggregate
 def list_periods(mode: str = Query("raw")):
     if mode not in {"raw", "normalized"}:
         raise HTTPException(status_code=400, detail="mode tidak valid")
@@ -93,6 +189,7 @@ def list_peserta(
 
 
 @app.get("/api/analytics")
+@cached_aggregate
 def analytics(
     periode: int = Query(...),
     mode: str = Query("raw"),
@@ -227,6 +324,7 @@ def analytics(
 
 
 @app.get("/api/trends")
+@cached_aggregate
 def trends(mode: str = Query("raw")):
     if mode not in {"raw", "normalized"}:
         raise HTTPException(status_code=400, detail="mode tidak valid")
@@ -244,6 +342,7 @@ def trends(mode: str = Query("raw")):
 
 
 @app.get("/api/trends/detail")
+@cached_aggregate
 def trends_detail(mode: str = Query("raw")):
     if mode not in {"raw", "normalized"}:
         raise HTTPException(status_code=400, detail="mode tidak valid")
@@ -272,3 +371,52 @@ def trends_detail(mode: str = Query("raw")):
             rows = fetchall_dict(cur)
 
     return {"items": rows}
+
+
+def require_import_token(authorization: Optional[str] = Header(None)):
+    token = os.getenv("IMPORT_TOKEN", "")
+    if not token:
+        raise HTTPException(status_code=403, detail="upload data dinonaktifkan")
+    scheme, _, supplied = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(
+        supplied.encode(), token.encode()
+    ):
+        raise HTTPException(status_code=401, detail="token tidak valid")
+
+
+@app.post(
+    "/api/imports",
+    status_code=202,
+    dependencies=[Depends(require_import_token)],
+)
+def create_import(file: UploadFile = File(...)):
+    filename = os.path.basename(file.filename or "")
+    if not filename.lower().endswith(".xlsx"):
+        raise HTTPException(status_code=400, detail="file harus berformat .xlsx")
+    if parse_periode(filename) is None:
+        raise HTTPException(
+            status_code=400, detail="periode tidak ditemukan dari nama file"
+        )
+
+    job_id = new_job_id()
+    try:
+        staged_path = save_upload(file.file, job_id)
+    except UploadTooLarge as exc:
+        raise HTTPException(status_code=413, detail=str(exc))
+    submit_import(job_id, staged_path, filename)
+    return get_job(job_id)
+
+
+@app.get("/api/imports", dependencies=[Depends(require_import_token)])
+def import_jobs(limit: int = Query(20, ge=1, le=200)):
+    return {"items": list_jobs(limit)}
+
+
+@app.get(
+    "/api/imports/{job_id}", dependencies=[Depends(require_import_token)]
+)
+def import_job_status(job_id: str):
+    job = get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="job tidak ditemukan")
+    return job
@@ -92,3 +92,34 @@ CREATE TABLE IF NOT EXISTS peserta_wisuda_raw (
 
 CREATE INDEX IF NOT EXISTS idx_peserta_wisuda_raw_periode
     ON peserta_wisuda_raw (periode);
+
+-- Table: data_version
+-- Bumped by load_xlsx.py after every import so that API workers can tell
+-- when their cached aggregates are stale.
+CREATE TABLE IF NOT EXISTS data_version (
+    id INTEGER PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITHOUT TIME ZONE DEFAULT NOW()
+);
+
+INSERT INTO data_version (id, version) VALUES (1, 0)
+    ON CONFLICT (id) DO NOTHING;
+
+-- Table: import_jobs
+-- Status and progress of workbooks uploaded through POST /api/imports.
+CREATE TABLE IF NOT EXISTS import_jobs (
+    id VARCHAR(32) PRIMARY KEY,
+    filename TEXT NOT NULL,
+    periode INTEGER NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'queued',
+    rows_parsed INTEGER NOT NULL DEFAULT 0,
+    rows_written INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    owner TEXT,
+    created_at TIMESTAMP WITHOUT TIME ZONE DEFAULT NOW(),
+    started_at TIMESTAMP WITHOUT TIME ZONE,
+    finished_at TIMESTAMP WITHOUT TIME ZONE,
+    -- Refreshed by the owning API worker while the job is queued or running;
+    -- a stale heartbeat means that worker is gone.
+    heartbeat_at TIMESTAMP WITHOUT TIME ZONE DEFAULT NOW()
+);
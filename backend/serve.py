@@ -0,0 +1,46 @@
+import os
+from pathlib import Path
+
+import uvicorn
+from dotenv import load_dotenv
+
+load_dotenv(Path(__file__).resolve().parent / ".env")
+
+
+def connections_per_worker() -> int:
+    pool_size = max(1, int(os.getenv("PG_POOL_SIZE", "5")))
+    # Every running background import holds two unpooled connections.
+    import_workers = max(1, int(os.getenv("IMPORT_WORKERS", "2")))
+    return pool_size + 2 * import_workers
+
+
+def worker_count() -> int:
+    configured = os.getenv("WEB_CONCURRENCY")
+    if configured:
+        workers = max(1, int(configured))
+    elif hasattr(os, "sched_getaffinity"):
+        # Honours CPU affinity / cpusets only; a CFS quota such as
+        # `docker run --cpus` is not visible here, so set WEB_CONCURRENCY
+        # explicitly in that case.
+        workers = max(1, len(os.sched_getaffinity(0)))
+    else:
+        workers = os.cpu_count() or 1
+
+    # Keep workers * connections below what Postgres will accept
+    # (max_connections defaults to 100; leave room for admin and load_xlsx).
+    budget = int(os.getenv("PG_CONNECTION_BUDGET", "80"))
+    return max(1, min(workers, budget // connections_per_worker()))
+
+
+def main():
+    uvicorn.run(
+        "main:app",
+        app_dir=str(Path(__file__).resolve().parent),
+        host=os.getenv("HOST", "0.0.0.0"),
+        port=int(os.getenv("PORT", "8000")),
+        workers=worker_count(),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import pytest
+
+from backend import cache
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    monkeypatch.setattr(cache, "_version", None)
+    cache._entries.clear()
+    yield
+    cache._entries.clear()
+
+
+def test_store_then_lookup():
+    assert cache._lookup("a", 1) is None
+    cache._store("a", 1, {"total": 3})
+    assert cache._lookup("a", 1) == {"total": 3}
+
+
+def test_version_change_clears_entries():
+    cache._lookup("a", 1)
+    cache._store("a", 1, "old")
+    assert cache._lookup("a", 2) is None
+    assert len(cache._entries) == 0
+
+
+def test_store_ignores_stale_version():
+    cache._lookup("a", 2)
+    cache._store("a", 1, "computed before the bump")
+    assert cache._lookup("a", 2) is None
+
+
+def test_lru_eviction(monkeypatch):
+    monkeypatch.setattr(cache, "CACHE_MAX_ENTRIES", 2)
+    cache._lookup("a", 1)
+    cache._store("a", 1, "a")
+    cache._store("b", 1, "b")
+    cache._lookup("a", 1)  # "b" becomes least recently used
+    cache._store("c", 1, "c")
+    assert cache._lookup("b", 1) is None
+    assert cache._lookup("a", 1) == "a"
+    assert cache._lookup("c", 1) == "c"
+
+
+def test_cached_aggregate_recomputes_after_bump(monkeypatch):
+    version = [1]
+    calls = []
+    monkeypatch.setattr(cache, "_current_version", lambda: version[0])
+
+    @cache.cached_aggregate
+    def trends(mode="raw"):
+        calls.append(mode)
+        return {"items": len(calls)}
+
+    assert trends(mode="raw") == {"items": 1}
+    assert trends(mode="raw") == {"items": 1}
+    version[0] = 2
+    assert trends(mode="raw") == {"items": 2}
+    assert calls == ["raw", "raw"]
+
+
+def test_older_version_does_not_roll_back():
+    cache._lookup("a", 2)
+    cache._store("a", 2, "new")
+    assert cache._lookup("b", 1) is None
+    cache._store("b", 1, "old")
+    assert cache._version == 2
+    assert cache._lookup("a", 2) == "new"
+    assert cache._lookup("b", 2) is None
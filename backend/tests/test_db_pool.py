@@ -0,0 +1,84 @@
+import queue
+import threading
+
+import pytest
+
+from backend import db
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        if self.conn.broken:
+            raise ConnectionError("server closed the connection")
+
+
+class FakeConn:
+    def __init__(self):
+        self.broken = False
+        self.closed = False
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    created = []
+
+    def connect():
+        conn = FakeConn()
+        created.append(conn)
+        return conn
+
+    monkeypatch.setattr(db, "connect", connect)
+    monkeypatch.setattr(db, "_pool_slots", threading.BoundedSemaphore(2))
+    monkeypatch.setattr(db, "_idle_conns", queue.LifoQueue(maxsize=2))
+    monkeypatch.setattr(db, "POOL_TIMEOUT", 0.05)
+    return created
+
+
+def test_connection_is_reused(pool):
+    with db.get_conn() as first:
+        pass
+    with db.get_conn() as second:
+        pass
+    assert first is second
+    assert len(pool) == 1
+
+
+def test_pool_is_bounded(pool):
+    with db.get_conn(), db.get_conn():
+        with pytest.raises(RuntimeError):
+            with db.get_conn():
+                pass
+    with db.get_conn():
+        pass
+
+
+def test_stale_connection_is_replaced(pool):
+    with db.get_conn() as stale:
+        pass
+    stale.broken = True
+    with db.get_conn() as conn:
+        assert conn is not stale
+    assert stale.closed
+
+
+def test_connection_dropped_after_error(pool):
+    with pytest.raises(ValueError):
+        with db.get_conn() as conn:
+            raise ValueError("boom")
+    assert conn.closed
+    assert db._idle_conns.empty()
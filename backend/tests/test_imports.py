@@ -0,0 +1,168 @@
+import io
+import os
+from contextlib import contextmanager
+
+import pytest
+from fastapi.testclient import TestClient
+from openpyxl import Workbook
+
+from backend import jobs, load_xlsx, main
+
+client = TestClient(main.app)
+
+
+def upload(headers=None, content=b"data", filename="Periode 92.xlsx"):
+    return client.post(
+        "/api/imports",
+        files={"file": (filename, io.BytesIO(content))},
+        headers=headers or {},
+    )
+
+
+def test_upload_disabled_without_token(monkeypatch):
+    monkeypatch.delenv("IMPORT_TOKEN", raising=False)
+    assert upload().status_code == 403
+
+
+def test_upload_rejects_wrong_token(monkeypatch):
+    monkeypatch.setenv("IMPORT_TOKEN", "rahasia")
+    assert upload({"Authorization": "Bearer salah"}).status_code == 401
+    assert client.get("/api/imports").status_code == 401
+
+
+def test_upload_rejects_large_body_before_parsing(monkeypatch):
+    monkeypatch.setenv("IMPORT_TOKEN", "rahasia")
+    response = client.post(
+        "/api/imports",
+        content=b"x",
+        headers={
+            "Authorization": "Bearer rahasia",
+            "Content-Length": str(main.MAX_UPLOAD_BYTES * 2),
+        },
+    )
+    assert response.status_code == 413
+
+
+def test_save_upload_enforces_limit(monkeypatch, tmp_path):
+    monkeypatch.setattr(jobs, "MAX_UPLOAD_BYTES", 4)
+    monkeypatch.setattr(jobs, "get_data_dir", lambda: str(tmp_path))
+    with pytest.raises(jobs.UploadTooLarge):
+        jobs.save_upload(io.BytesIO(b"12345"), "job")
+    assert os.listdir(jobs.get_staging_dir()) == []
+
+
+def test_replace_rejects_workbook_without_rows(tmp_path):
+    wb = Workbook()
+    wb.active.append(["NPM", "Nama"])
+    wb.active.append([None, "tanpa npm"])
+    path = tmp_path / "Periode 7.xlsx"
+    wb.save(path)
+
+    with pytest.raises(ValueError):
+        load_xlsx.load_file(str(path), replace=True)
+    assert load_xlsx.load_file(str(path)) == 0
+
+
+class RecordingConn:
+    def __init__(self, log, fail):
+        self.log = log
+        self.fail = fail
+
+    def cursor(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        if self.fail:
+            raise ConnectionError("database down")
+        self.log.append((sql, params))
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def status_log(monkeypatch):
+    log = []
+    attempts = []
+
+    def connect():
+        # The first connection attempt fails; the reconnect succeeds.
+        attempts.append(1)
+        return RecordingConn(log, fail=len(attempts) == 1)
+
+    monkeypatch.setattr(jobs, "connect", connect)
+    return log
+
+
+def staged_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs, "get_data_dir", lambda: str(tmp_path))
+    os.makedirs(jobs.get_staging_dir())
+    staged = os.path.join(jobs.get_staging_dir(), "job.xlsx")
+    with open(staged, "wb") as out:
+        out.write(b"baru")
+    return staged
+
+
+def test_failed_import_records_error(monkeypatch, tmp_path, status_log):
+    staged = staged_file(tmp_path, monkeypatch)
+    (tmp_path / "Periode 1.xlsx").write_bytes(b"lama")
+
+    def failing_load(*args, **kwargs):
+        raise ValueError("workbook rusak")
+
+    monkeypatch.setattr(jobs, "load_file", failing_load)
+    jobs._run_import("job", staged, "Periode 1.xlsx", 1)
+
+    sql, params = status_log[-1]
+    assert "status = 'failed'" in sql
+    assert params == ["workbook rusak", "job"]
+    # The source workbook on disk is untouched and the staging file is gone.
+    assert (tmp_path / "Periode 1.xlsx").read_bytes() == b"lama"
+    assert not os.path.exists(staged)
+
+
+def test_successful_import_publishes_after_commit(
+    monkeypatch, tmp_path, status_log
+):
+    staged = staged_file(tmp_path, monkeypatch)
+    (tmp_path / "Periode 1.xlsx").write_bytes(b"lama")
+
+    @contextmanager
+    def fake_dedicated_conn():
+        yield RecordingConn([], fail=False)
+
+    def fake_load(path, replace, progress, conn_factory, periode):
+        assert path == staged and periode == 1
+        with conn_factory():
+            # Still inside the transaction: nothing published yet.
+            assert (tmp_path / "Periode 1.xlsx").read_bytes() == b"lama"
+        progress(3, 3)
+        return 3
+
+    monkeypatch.setattr(jobs, "dedicated_conn", fake_dedicated_conn)
+    monkeypatch.setattr(jobs, "load_file", fake_load)
+    jobs._run_import("job", staged, "Periode 1.xlsx", 1)
+
+    assert (tmp_path / "Periode 1.xlsx").read_bytes() == b"baru"
+    sql, params = status_log[-1]
+    assert "status = 'done'" in sql and "heartbeat_at = NOW()" in sql
+    assert params == [3, 3, "job"]
+
+
+def test_with_throughput():
+    job = jobs._with_throughput({"rows_written": 500, "elapsed_seconds": 2.5})
+    assert job == {
+        "rows_written": 500,
+        "elapsed_seconds": 2.5,
+        "rows_per_second": 200.0,
+    }
+    job = jobs._with_throughput({"rows_written": 0, "elapsed_seconds": None})
+    assert job["elapsed_seconds"] is None and job["rows_per_second"] is None
+    job = jobs._with_throughput({"rows_written": 10, "elapsed_seconds": 0})
+    assert job["elapsed_seconds"] == 0 and job["rows_per_second"] is None